@@ -0,0 +1,108 @@
+import zlib
+
+from .Util import Util
+
+
+class PerMessageDeflate(object):
+	name = "permessage-deflate"
+	tail = b"\x00\x00\xff\xff"
+
+	def __init__(self,
+		clientMaxWindowBits=15,
+		serverMaxWindowBits=None,
+		clientNoContextTakeover=False,
+		serverNoContextTakeover=False,
+		threshold=128,
+		level=zlib.Z_DEFAULT_COMPRESSION
+	):
+		if not 8 <= clientMaxWindowBits <= 15:
+			raise ValueError("clientMaxWindowBits must be between 8 and 15")
+		if serverMaxWindowBits is not None and not 8 <= serverMaxWindowBits <= 15:
+			raise ValueError("serverMaxWindowBits must be between 8 and 15 or None")
+
+		self.logger = Util.configLogger(__name__)
+		self.clientMaxWindowBits = clientMaxWindowBits
+		self.serverMaxWindowBits = serverMaxWindowBits
+		self.clientNoContextTakeover = clientNoContextTakeover
+		self.serverNoContextTakeover = serverNoContextTakeover
+		self.threshold = threshold
+		self.level = level
+
+		self.enabled = False
+		self.windowBits = clientMaxWindowBits
+		self.resetCompressor = clientNoContextTakeover
+		self.resetDecompressor = serverNoContextTakeover
+		self.compressor = None
+		self.decompressor = None
+
+		self.rawSent = 0
+		self.compressedSent = 0
+		self.rawReceived = 0
+		self.compressedReceived = 0
+
+	# value of Sec-WebSocket-Extensions request header
+	def offer(self):
+		params = [self.name, "client_max_window_bits"]
+		if self.clientMaxWindowBits != 15: params[1] += "={0}".format(self.clientMaxWindowBits)
+		if self.serverMaxWindowBits is not None: params.append("server_max_window_bits={0}".format(self.serverMaxWindowBits))
+		if self.clientNoContextTakeover: params.append("client_no_context_takeover")
+		if self.serverNoContextTakeover: params.append("server_no_context_takeover")
+		return "; ".join(params)
+
+	# called with Sec-WebSocket-Extensions response header, None if absent
+	def negotiate(self, response):
+		self.enabled = False
+		self.compressor = None
+		self.decompressor = None
+
+		for extension in (response or "").split(","):
+			params = [x.strip() for x in extension.split(";")]
+			if params[0] != self.name: continue
+
+			self.windowBits = self.clientMaxWindowBits
+			self.resetCompressor = self.clientNoContextTakeover
+			self.resetDecompressor = self.serverNoContextTakeover
+			for param in params[1:]:
+				key, _, value = param.partition("=")
+				key = key.strip()
+				value = value.strip().strip('"')
+				if key == "client_max_window_bits" and value != "": self.windowBits = min(self.windowBits, int(value))
+				if key == "client_no_context_takeover": self.resetCompressor = True
+				if key == "server_no_context_takeover": self.resetDecompressor = True
+
+			self.enabled = True
+			break
+
+		self.logger.info("{0} {1}".format(self.name, "enabled : " + response if self.enabled else "not accepted by server"))
+		return self.enabled
+
+	def shouldCompress(self, payload):
+		return self.enabled and len(payload) >= self.threshold
+
+	def compress(self, payload):
+		# zlib does not accept 8 window bits on raw deflate, 9 stays within the negotiated window
+		if self.compressor is None or self.resetCompressor:
+			self.compressor = zlib.compressobj(self.level, zlib.DEFLATED, -max(9, self.windowBits))
+
+		compressed = self.compressor.compress(payload) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+		if compressed.endswith(self.tail): compressed = compressed[:-len(self.tail)]
+
+		self.rawSent += len(payload)
+		self.compressedSent += len(compressed)
+		return compressed
+
+	def decompress(self, payload):
+		if self.decompressor is None or self.resetDecompressor:
+			self.decompressor = zlib.decompressobj(-15)
+
+		decompressed = self.decompressor.decompress(bytes(payload) + self.tail)
+
+		self.rawReceived += len(decompressed)
+		self.compressedReceived += len(payload)
+		return decompressed
+
+	# compressed bytes / raw bytes of compressed messages, None before any compression
+	def ratio(self):
+		raw = self.rawSent + self.rawReceived
+		if raw == 0: return None
+		return (self.compressedSent + self.compressedReceived) / raw
@@ -6,6 +6,12 @@ class UnauthorizedError(Exception):
 class WebSocketError(Exception):
 	pass
 
+class WebSocketHandshakeError(WebSocketError):
+	def __init__(self, message="", statusCode=None):
+		if message == "": message = "websocket handshake failed with status code {0}".format(statusCode)
+		super().__init__(message)
+		self.statusCode = statusCode
+
 class InvokeTimeoutError(Exception):
 	pass
 
@@ -23,3 +29,8 @@ class ConnectionClosingError(Exception):
 	def __init__(self, message=""):
 		if message == "": message = "failed to close connection"
 		super().__init__(message)
+
+class RateLimitError(Exception):
+	def __init__(self, message=""):
+		if message == "": message = "send rate limit exceeded, message was not sent"
+		super().__init__(message)
@@ -25,7 +25,8 @@ class HubConnection(object):
 		authFunction,
 		verifySsl,
 		skipNegotiation,
-		headers
+		headers,
+		rateLimiter=None
 	):
 		self.url = url
 		self.protocol = protocol
@@ -37,6 +38,7 @@ class HubConnection(object):
 		self.verifySsl = verifySsl
 		self.skipNegotiation = skipNegotiation
 		self.headers = headers
+		self.rateLimiter = rateLimiter
 
 		self.logger = Util.configLogger(__name__)
 		self.invokeTimeout = 5
@@ -152,6 +154,10 @@ class HubConnection(object):
 			self.transport.stop()
 			self._checkThread(ntry - 1)
 
+	# compressed bytes / raw bytes on the transport, None if not compressed
+	def compressionRatio(self):
+		return self.transport.compressionRatio()
+
 	def onOpen(self, handler):
 		if not callable(handler):
 			raise TypeError("argument handler must be callable function")
@@ -186,31 +192,54 @@ class HubConnection(object):
 		if type(arguments) is not list: raise TypeError("arguments must be a list")
 		if self.state != ConnectionState.connected: raise NotConnectedError()
 
+		# waiting for the rate limiter and for the result share one invokeTimeout
+		deadline = time.monotonic() + self.invokeTimeout
+		if not self._acquireRate(target, self.invokeTimeout): raise RateLimitError()
+
 		try:
 			invocationId = str(uuid.uuid4())
 			message = Message.createInvocation(invocationId, target, arguments, headers=self.headers)
 			myQueue = {"invocationId": invocationId, "queue": queue.Queue()}
 			
 			self.resultQueues.append(myQueue)
+			sentAt = time.monotonic()
 			self._sendTransport(message)
 
-			result = myQueue["queue"].get(timeout=self.invokeTimeout)
+			result = myQueue["queue"].get(timeout=max(0, deadline - time.monotonic()))
+			if self.rateLimiter is not None: self.rateLimiter.reportLatency(time.monotonic() - sentAt)
 			return result
 		except queue.Empty as e:
 			self.resultQueues.remove(myQueue)
+			if self.rateLimiter is not None: self.rateLimiter.reportTimeout()
 			raise InvokeTimeoutError("cannot get result within {} sec".format(self.invokeTimeout))
 		except Exception as e:
 			raise
 	
-	def send(self, target, arguments):
+	# timeout None waits for the rate limiter as long as needed
+	def send(self, target, arguments, timeout=None):
 		if type(arguments) is not list: raise TypeError("arguments must be a list")
 		if self.state != ConnectionState.connected: raise NotConnectedError()
+		if not self._acquireRate(target, timeout): raise RateLimitError()
 		
 		try:
 			message = Message.createInvocationNonBlocking(target, arguments, headers=self.headers)
 			self._sendTransport(message)
 		except Exception as e:
 			raise
+
+	# returns False without sending if the rate limit is exceeded
+	def trySend(self, target, arguments):
+		if type(arguments) is not list: raise TypeError("arguments must be a list")
+		if self.state != ConnectionState.connected: raise NotConnectedError()
+		if self.rateLimiter is not None and not self.rateLimiter.tryAcquire(target): return False
+
+		message = Message.createInvocationNonBlocking(target, arguments, headers=self.headers)
+		self._sendTransport(message)
+		return True
+
+	def _acquireRate(self, target, timeout):
+		if self.rateLimiter is None: return True
+		return self.rateLimiter.acquire(target, timeout)
 		
 	def _sendPing(self):
 		if self.state != ConnectionState.connected: return
@@ -1,6 +1,10 @@
+import copy
+
 from .Util import Util
 from .HubConnection import HubConnection
 from .ConnectionChecker import ConnectionChecker
+from .RateLimiter import RateLimiter
+from .RedundantHubConnection import RedundantHubConnection
 from . import Protocol
 from . import Transport
 
@@ -24,8 +28,15 @@ conn = HubConnectionBuilder() \\
 	}) \\
 	.configureLogging(level=logging.INFO, handler=None, socketTrace=False)
 	.withProtocol(protocol=Protocol.JsonProtocol(version=1))
-	.withTransport(transport=Transport.WebSocketTransport())
+	.withTransport(transport=Transport.WebSocketTransport(
+		compression=None))                     # Compression.PerMessageDeflate(threshold=128)
+		                                       # or Transport.NativeWebSocketTransport() without websocket-client
 	.withAutomaticReconnect(interval=5, surrender=True)
+	.withRateLimit(rate=None, burst=None,      # messages/sec and burst on the connection
+		targets={},                            # per target limits {"name": rate or (rate, burst)}
+		adaptive=False)                        # slow down when invoke latency rises
+	.withRedundantUrls(["wss://hogeguga2.com"], # same hub on other endpoints
+		hedge=True, hedgeDelay=1.0)            # duplicate invoke after p95 latency
 	.build()"""
 		print(helpMessage)
 
@@ -33,9 +44,11 @@ conn = HubConnectionBuilder() \\
 		self.hubUrl = None
 		self.options = None
 		self.protocol = Protocol.JsonProtocol(version=1)
-		self.transport = Transport.WebSocketTransport()
+		self.transport = None
 		self.reconnection = None
 		self.surrender = True
+		self.rateLimit = None
+		self.redundancy = None
 
 	def withUrl(self, hubUrl, options = {}):
 		if hubUrl is None or hubUrl.strip() == "":
@@ -93,6 +106,62 @@ conn = HubConnectionBuilder() \\
 		self.surrender = surrender
 		return self
 
+	def withRateLimit(self, rate=None, burst=None, targets=None, adaptive=False):
+		if rate is not None: self._checkLimit("rate", rate, burst)
+
+		if burst is not None and rate is None:
+			raise ValueError("burst needs rate")
+
+		if targets is not None:
+			if type(targets) is not dict:
+				raise TypeError("targets must be a dict {0}.".format(targets))
+
+			for target, limit in targets.items():
+				name = "limit of target {0}".format(target)
+				if type(limit) is tuple:
+					if len(limit) != 2:
+						raise ValueError("{0} must be a (rate, burst) tuple".format(name))
+					self._checkLimit(name, *limit)
+				else:
+					self._checkLimit(name, limit, None)
+
+		if type(adaptive) is not bool:
+			raise TypeError("adaptive must be a bool")
+
+		self.rateLimit = {"rate": rate, "burst": burst, "targets": targets, "adaptive": adaptive}
+		return self
+
+	@staticmethod
+	def _checkLimit(name, rate, burst):
+		if type(rate) not in (int, float):
+			raise TypeError("{0} must be a number or (rate, burst) tuple".format(name))
+
+		if rate <= 0:
+			raise ValueError("{0} must have a positive rate".format(name))
+
+		if burst is not None and type(burst) is not int:
+			raise TypeError("burst of {0} must be an integer or None".format(name))
+
+		if burst is not None and burst < 1:
+			raise ValueError("burst of {0} must be 1 or more".format(name))
+
+	def withRedundantUrls(self, hubUrls, hedge=True, hedgeDelay=1.0):
+		if type(hubUrls) is not list or len(hubUrls) == 0:
+			raise TypeError("hubUrls must be a non-empty list")
+
+		for hubUrl in hubUrls:
+			if hubUrl is None or hubUrl.strip() == "":
+				raise ValueError("hubUrl must be a valid url.")
+
+		if type(hedge) is not bool:
+			raise TypeError("hedge must be a bool")
+
+		if type(hedgeDelay) not in (int, float):
+			raise TypeError("hedgeDelay must be a number")
+
+		self.redundancy = {"hubUrls": hubUrls, "hedge": hedge, "hedgeDelay": hedgeDelay}
+		return self
+
 	def build(self):
 		authFunction = None
 		if "accessTokenFactory" in self.options.keys():
@@ -118,17 +187,50 @@ conn = HubConnectionBuilder() \\
 		if "serverTimeout" in self.options.keys():
 			serverTimeout = self.options["serverTimeout"]
 
-		connectionChecker = ConnectionChecker(keepAliveInterval, serverTimeout)
+		settings = {
+			"authFunction": authFunction,
+			"verifySsl": verifySsl,
+			"skipNegotiation": skipNegotiation,
+			"keepAliveInterval": keepAliveInterval,
+			"serverTimeout": serverTimeout
+		}
+
+		# default transport is created here to import websocket-client only when used
+		transport = self.transport
+		if transport is None: transport = Transport.WebSocketTransport()
+
+		# one limiter is shared by redundant endpoints, limits apply to all of them together
+		rateLimiter = None
+		if self.rateLimit is not None:
+			rateLimiter = RateLimiter(**self.rateLimit)
+
+		if self.redundancy is None:
+			return self._buildConnection(self.hubUrl, transport, headers, rateLimiter, settings)
+
+		# every endpoint needs its own transport and headers (Authorization is set per connection)
+		connections = [self._buildConnection(self.hubUrl, transport, dict(headers), rateLimiter, settings)]
+		for hubUrl in self.redundancy["hubUrls"]:
+			connections.append(self._buildConnection(hubUrl, copy.deepcopy(transport), dict(headers), rateLimiter, settings))
+
+		return RedundantHubConnection(
+			connections,
+			hedge=self.redundancy["hedge"],
+			hedgeDelay=self.redundancy["hedgeDelay"]
+		)
+
+	def _buildConnection(self, hubUrl, transport, headers, rateLimiter, settings):
+		connectionChecker = ConnectionChecker(settings["keepAliveInterval"], settings["serverTimeout"])
 
 		return HubConnection(
-			url=self.hubUrl,
+			url=hubUrl,
 			protocol=self.protocol,
-			transport=self.transport,
+			transport=transport,
 			connectionChecker=connectionChecker,
 			reconnection=self.reconnection,
 			surrender=self.surrender,
-			authFunction=authFunction,
-			verifySsl=verifySsl,
-			skipNegotiation=skipNegotiation,
-			headers=headers
+			authFunction=settings["authFunction"],
+			verifySsl=settings["verifySsl"],
+			skipNegotiation=settings["skipNegotiation"],
+			headers=headers,
+			rateLimiter=rateLimiter
 		)
@@ -24,7 +24,9 @@ class JsonProtocol(Protocol):
 		encoded = json.dumps(message) + self.separator
 		return encoded
 
+	# raw can be bytes-like (memoryview from NativeWebSocketTransport), decoded without copy
 	def decode(self, raw):
+		if type(raw) is not str: raw = str(raw, "utf-8")
 		messages = [ x for x in raw.split(self.separator) if x != "" ]
 		decoded = [ json.loads(x) for x in messages ]
 		return decoded
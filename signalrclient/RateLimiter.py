@@ -0,0 +1,127 @@
+import threading
+import time
+
+from .Util import Util
+
+
+class TokenBucket(object):
+	def __init__(self, rate, burst=None):
+		if rate <= 0: raise ValueError("rate must be a positive number")
+		if burst is not None and burst < 1: raise ValueError("burst must be 1 or more")
+
+		self.rate = rate
+		self.burst = burst if burst is not None else max(1, rate)
+		self.tokens = self.burst
+		self.lastRefill = time.monotonic()
+
+	def refill(self, now, scale=1.0):
+		elapsed = now - self.lastRefill
+		self.tokens = min(self.burst, self.tokens + elapsed * self.rate * scale)
+		self.lastRefill = now
+
+	# seconds until one token is available, 0 if available now
+	def waitTime(self, scale=1.0):
+		if self.tokens >= 1: return 0
+		return (1 - self.tokens) / (self.rate * scale)
+
+	def consume(self):
+		self.tokens -= 1
+
+
+class RateLimiter(object):
+	def __init__(self,
+		rate=None,
+		burst=None,
+		targets=None,
+		adaptive=False,
+		minScale=0.1,
+		latencyThreshold=2.0,
+		adjustInterval=1.0
+	):
+		self.logger = Util.configLogger(__name__)
+		self.lock = threading.Lock()
+
+		self.connectionBucket = TokenBucket(rate, burst) if rate is not None else None
+		self.targetBuckets = {}
+		for target, limit in (targets or {}).items():
+			if type(limit) is tuple: self.targetBuckets[target] = TokenBucket(*limit)
+			else: self.targetBuckets[target] = TokenBucket(limit)
+
+		# adaptive mode scales every bucket rate by self.scale (AIMD)
+		self.adaptive = adaptive
+		self.minScale = minScale
+		self.latencyThreshold = latencyThreshold
+		self.adjustInterval = adjustInterval
+		self.scale = 1.0
+		self.latency = None
+		self.baseLatency = None
+		self.lastAdjusted = time.monotonic()
+
+	def _buckets(self, target):
+		buckets = []
+		if self.connectionBucket is not None: buckets.append(self.connectionBucket)
+		if target in self.targetBuckets: buckets.append(self.targetBuckets[target])
+		return buckets
+
+	# returns 0 and consumes tokens if allowed, otherwise seconds to wait
+	def _acquire(self, target):
+		with self.lock:
+			now = time.monotonic()
+			buckets = self._buckets(target)
+			for bucket in buckets: bucket.refill(now, self.scale)
+
+			wait = max([bucket.waitTime(self.scale) for bucket in buckets], default=0)
+			if wait > 0: return wait
+
+			for bucket in buckets: bucket.consume()
+			return 0
+
+	def tryAcquire(self, target=None):
+		return self._acquire(target) == 0
+
+	# timeout None waits until tokens are available
+	def acquire(self, target=None, timeout=None):
+		deadline = None if timeout is None else time.monotonic() + timeout
+
+		while True:
+			wait = self._acquire(target)
+			if wait == 0: return True
+
+			if deadline is not None:
+				remaining = deadline - time.monotonic()
+				if remaining <= 0: return False
+				wait = min(wait, remaining)
+			time.sleep(wait)
+
+	def reportLatency(self, latency):
+		if not self.adaptive: return
+
+		with self.lock:
+			self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+			# baseline follows the minimum but drifts up slowly to accept a new normal
+			if self.baseLatency is None: self.baseLatency = latency
+			else: self.baseLatency = min(latency, self.baseLatency * 1.01)
+
+			now = time.monotonic()
+			if now - self.lastAdjusted < self.adjustInterval: return
+			self.lastAdjusted = now
+
+			oldScale = self.scale
+			if self.latency > self.baseLatency * self.latencyThreshold:
+				self.scale = max(self.minScale, self.scale * 0.5)
+			else:
+				self.scale = min(1.0, self.scale + 0.1)
+
+			if self.scale != oldScale:
+				self.logger.debug("send rate scale {0:.2f} -> {1:.2f} (latency {2:.3f} sec, base {3:.3f} sec)".format(
+					oldScale, self.scale, self.latency, self.baseLatency))
+
+	# timeout gives no latency sample, so slow down right away
+	def reportTimeout(self):
+		if not self.adaptive: return
+
+		with self.lock:
+			self.lastAdjusted = time.monotonic()
+			oldScale = self.scale
+			self.scale = max(self.minScale, self.scale * 0.5)
+			self.logger.debug("send rate scale {0:.2f} -> {1:.2f} (invoke timeout)".format(oldScale, self.scale))
@@ -0,0 +1,225 @@
+import threading
+import time
+import queue
+from collections import deque
+
+from .Util import Util
+from .Error import *
+from .ConnectionChecker import ConnectionState
+
+
+class Endpoint(object):
+	def __init__(self, connection, samples=100, failureHalfLife=10):
+		self.connection = connection
+		self.latencies = deque(maxlen=samples)
+		self.latency = None
+		self.failures = 0
+		self.failureHalfLife = failureHalfLife
+		self.lastFailure = None
+
+	def isHealthy(self):
+		return self.connection.state == ConnectionState.connected
+
+	def recordSuccess(self, latency):
+		self.latencies.append(latency)
+		self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+		self.failures = 0
+
+	# timeout is counted in the average latency but not in the hedge delay samples
+	def recordFailure(self, timeout=None):
+		now = time.monotonic()
+		self.failures = self.recentFailures(now) + 1
+		self.lastFailure = now
+		if timeout is not None:
+			self.latency = timeout if self.latency is None else 0.8 * self.latency + 0.2 * timeout
+
+	# failures fade out by half every failureHalfLife sec so a recovered endpoint is used again
+	def recentFailures(self, now):
+		if self.failures == 0: return 0
+		return self.failures * 0.5 ** ((now - self.lastFailure) / self.failureHalfLife)
+
+	# lower is better, endpoints without samples come first to get measured
+	# unless they have failed, each failure and staleness cost as much as a timeout
+	def score(self, staleAfter, failurePenalty):
+		score = (self.latency or 0) + self.recentFailures(time.monotonic()) * failurePenalty
+
+		lastReceived = self.connection.connectionChecker.lastReceived
+		if lastReceived is not None and time.time() - lastReceived > staleAfter: score += failurePenalty
+		return score
+
+
+class RedundantHubConnection(object):
+	def __init__(self,
+		connections,
+		hedge=True,
+		hedgePercentile=0.95,
+		hedgeDelay=1.0,
+		minSamples=20,
+		staleAfter=30,
+		failureHalfLife=10
+	):
+		self.logger = Util.configLogger(__name__)
+		self.endpoints = [Endpoint(x, failureHalfLife=failureHalfLife) for x in connections]
+		self.hedge = hedge
+		self.hedgePercentile = hedgePercentile
+		self.defaultHedgeDelay = hedgeDelay
+		self.minSamples = minSamples
+		self.staleAfter = staleAfter
+		self.invokeTimeout = 5
+
+		self.lock = threading.Lock()
+		self.openCount = 0
+
+		self._onOpen = lambda: self.logger.debug("dummy onOpen")
+		self._onClose = lambda: self.logger.debug("dummy onClose")
+
+		for endpoint in self.endpoints:
+			endpoint.connection.onOpen(self._onEndpointOpen)
+			endpoint.connection.onClose(self._onEndpointClose)
+
+	def __exit__(self, exception_type, exception_value, traceback):
+		self.stop()
+
+	@property
+	def invokeTimeout(self):
+		return self._invokeTimeout
+
+	@invokeTimeout.setter
+	def invokeTimeout(self, timeout):
+		self._invokeTimeout = timeout
+		for endpoint in self.endpoints: endpoint.connection.invokeTimeout = timeout
+
+	# average over endpoints which have compressed messages, None if none has
+	def compressionRatio(self):
+		ratios = [x.connection.compressionRatio() for x in self.endpoints]
+		ratios = [x for x in ratios if x is not None]
+		if len(ratios) == 0: return None
+		return sum(ratios) / len(ratios)
+
+	def isRunning(self):
+		return any(x.connection.isRunning() for x in self.endpoints)
+
+	def start(self):
+		started = [x.connection.start() for x in self.endpoints]
+		return any(started)
+
+	def stop(self):
+		for endpoint in self.endpoints: endpoint.connection.stop()
+
+	def _onEndpointOpen(self):
+		with self.lock:
+			self.openCount += 1
+			first = self.openCount == 1
+		if first: self._onOpen()
+
+	def _onEndpointClose(self):
+		with self.lock:
+			self.openCount = max(0, self.openCount - 1)
+			last = self.openCount == 0 and not self.isRunning()
+		if last: self._onClose()
+
+	# fired once when the first endpoint opens
+	def onOpen(self, handler):
+		if not callable(handler):
+			raise TypeError("argument handler must be callable function")
+		self._onOpen = handler
+
+	# fired once when every endpoint is closed
+	def onClose(self, handler):
+		if not callable(handler):
+			raise TypeError("argument handler must be callable function")
+		self._onClose = handler
+
+	def onReconnecting(self, handler):
+		for endpoint in self.endpoints: endpoint.connection.onReconnecting(handler)
+
+	def onReconnected(self, handler):
+		for endpoint in self.endpoints: endpoint.connection.onReconnected(handler)
+
+	# server messages sent to all clients arrive once per endpoint
+	def on(self, event, handler):
+		for endpoint in self.endpoints: endpoint.connection.on(event, handler)
+
+	def off(self, event):
+		for endpoint in self.endpoints: endpoint.connection.off(event)
+
+	def _healthyEndpoints(self):
+		endpoints = [x for x in self.endpoints if x.isHealthy()]
+		return sorted(endpoints, key=lambda x: x.score(self.staleAfter, self.invokeTimeout))
+
+	def hedgeDelay(self):
+		samples = sorted(latency for x in self.endpoints for latency in x.latencies)
+		if len(samples) < self.minSamples: return self.defaultHedgeDelay
+		return samples[int(self.hedgePercentile * (len(samples) - 1))]
+
+	def _invokeOn(self, endpoint, target, arguments, results):
+		def run():
+			try:
+				start = time.monotonic()
+				result = endpoint.connection.invoke(target, arguments)
+				endpoint.recordSuccess(time.monotonic() - start)
+				results.put((endpoint, True, result))
+			except RateLimitError as e:
+				# our own send budget, not the health of the endpoint
+				results.put((endpoint, False, e))
+			except InvokeTimeoutError as e:
+				endpoint.recordFailure(self.invokeTimeout)
+				results.put((endpoint, False, e))
+			except Exception as e:
+				endpoint.recordFailure()
+				results.put((endpoint, False, e))
+
+		thread = threading.Thread(target=run)
+		thread.setDaemon(True)
+		thread.start()
+
+	# hub method must be idempotent when hedge is enabled, it can run on two endpoints
+	def invoke(self, target, arguments):
+		if type(arguments) is not list: raise TypeError("arguments must be a list")
+
+		endpoints = self._healthyEndpoints()
+		if len(endpoints) == 0: raise NotConnectedError()
+
+		start = time.monotonic()
+		deadline = start + self.invokeTimeout
+		hedgeAt = start + self.hedgeDelay()
+		backups = endpoints[1:2] if self.hedge else []
+		results = queue.Queue()
+		error = None
+
+		self._invokeOn(endpoints[0], target, arguments, results)
+		pending = 1
+
+		while pending > 0 or len(backups) > 0:
+			waitUntil = min(deadline, hedgeAt) if len(backups) > 0 else deadline
+			try:
+				endpoint, ok, value = results.get(timeout=max(0, waitUntil - time.monotonic()))
+			except queue.Empty:
+				if len(backups) > 0 and time.monotonic() < deadline:
+					self.logger.debug("hedge invocation {0} after {1:.3f} sec".format(target, time.monotonic() - start))
+					self._invokeOn(backups.pop(), target, arguments, results)
+					pending += 1
+					continue
+				raise InvokeTimeoutError("cannot get result within {} sec".format(self.invokeTimeout))
+
+			pending -= 1
+			if ok:
+				# primary lost to the hedge, rank it down before its late result arrives
+				if endpoint is not endpoints[0] and pending > 0: endpoints[0].recordFailure()
+				return value
+
+			# failed before the hedge delay, try the backup right away
+			error = value
+			hedgeAt = time.monotonic()
+
+		raise error
+
+	def send(self, target, arguments, timeout=None):
+		endpoints = self._healthyEndpoints()
+		if len(endpoints) == 0: raise NotConnectedError()
+		endpoints[0].connection.send(target, arguments, timeout)
+
+	def trySend(self, target, arguments):
+		endpoints = self._healthyEndpoints()
+		if len(endpoints) == 0: raise NotConnectedError()
+		return endpoints[0].connection.trySend(target, arguments)
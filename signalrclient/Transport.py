@@ -1,8 +1,17 @@
-import websocket
 import ssl
+import socket
+import threading
 
 from .Util import Util
 from .Error import *
+from .WebSocketEngine import WebSocketEngine, Opcode
+
+# websocket-client is imported by the first WebSocketTransport, NativeWebSocketTransport does not need it
+websocket = None
+
+def _importWebSocket():
+	global websocket
+	if websocket is None: import websocket
 
 
 class Transport(object):
@@ -22,14 +31,33 @@ class Transport(object):
 	def send(self, encoded):
 		self.logger.error("must override this method")
 
+	def compressionRatio(self):
+		return None
+
 class WebSocketTransport(Transport):
-	def __init__(self):
+	def __init__(self, compression=None):
+		_importWebSocket()
 		super().__init__(__name__)
 		self.webSocket = None
 		websocket.enableTrace(Util.logSocketTrace)
 		self.opcode = 0x1 # 0x2 for binary
+		self.compression = compression
+		self.compressedMessage = False
+		self.sendLock = None
 
 	def initialize(self, url, header, onOpen, onMessage, onError, onClose):
+		if self.compression is not None and not self._supportsCompression():
+			self.logger.warning("websocket-client {0} is not supported for compression, compression disabled".format(websocket.__version__))
+			self.compression = None
+
+		if self.compression is not None:
+			header = dict(header)
+			header["Sec-WebSocket-Extensions"] = self.compression.offer()
+			openHandler, messageHandler = onOpen, onMessage
+			onOpen = lambda ws: self._onOpenCompression(ws, openHandler)
+			onMessage = lambda ws, message: messageHandler(ws, self._decompress(message))
+			self.sendLock = threading.Lock()
+
 		self.webSocket = websocket.WebSocketApp(
 			url,
 			header=header,
@@ -40,15 +68,71 @@ class WebSocketTransport(Transport):
 		)
 
 	def run(self, verifySsl):
+		# compressed text frames are not valid utf-8, decoding is done in _decompress
 		self.webSocket.run_forever(
-			sslopt={"cert_reqs": ssl.CERT_NONE} if not verifySsl else {}
+			sslopt={"cert_reqs": ssl.CERT_NONE} if not verifySsl else {},
+			skip_utf8_validation=self.compression is not None
 		)
 
 	def stop(self):
 		self.webSocket.close()
 
 	def send(self, encoded):
-		self.webSocket.send(encoded, self.opcode)
+		if self.compression is None or not self.compression.enabled:
+			self.webSocket.send(encoded, self.opcode)
+			return
+
+		payload = encoded.encode("utf-8") if type(encoded) is str else encoded
+		if not self.compression.shouldCompress(payload):
+			self.webSocket.send(payload, self.opcode)
+			return
+
+		# compressor context must follow the order of frames on the wire
+		with self.sendLock:
+			frame = websocket.ABNF.create_frame(self.compression.compress(payload), self.opcode)
+			frame.rsv1 = 1
+			self.webSocket.sock.send_frame(frame)
+
+	def compressionRatio(self):
+		if self.compression is None: return None
+		return self.compression.ratio()
+
+	def _onOpenCompression(self, ws, onOpen):
+		headers = ws.sock.headers or {}
+		if self.compression.negotiate(headers.get("sec-websocket-extensions")):
+			self._hookFrameBuffer(ws.sock.frame_buffer)
+		onOpen(ws)
+
+	# compression relies on frame_buffer internals and on run_forever keeping text
+	# as bytes with skip_utf8_validation, verified with websocket-client 1.5 - 1.9
+	@staticmethod
+	def _supportsCompression():
+		version = tuple(int(x) for x in websocket.__version__.split(".")[:2] if x.isdigit())
+		frameBuffer = getattr(getattr(websocket, "_abnf", None), "frame_buffer", None)
+		return (1, 5) <= version < (1, 10) and hasattr(frameBuffer, "recv_header")
+
+	# websocket-client rejects frames with rsv1, so it is taken off the header
+	# here and remembered for the message the frame starts
+	def _hookFrameBuffer(self, frameBuffer):
+		recvHeader = frameBuffer.recv_header
+
+		def recvHeaderCompression():
+			recvHeader()
+			if len(frameBuffer.header) != 7:
+				raise WebSocketError("unsupported websocket-client frame header for compression")
+			fin, rsv1, rsv2, rsv3, opcode, hasMask, lengthBits = frameBuffer.header
+			if opcode in (websocket.ABNF.OPCODE_TEXT, websocket.ABNF.OPCODE_BINARY):
+				self.compressedMessage = bool(rsv1)
+			frameBuffer.header = (fin, 0, rsv2, rsv3, opcode, hasMask, lengthBits)
+
+		frameBuffer.recv_header = recvHeaderCompression
+
+	def _decompress(self, message):
+		if self.compressedMessage:
+			message = self.compression.decompress(message)
+			self.compressedMessage = False
+		if type(message) is not str: message = message.decode("utf-8")
+		return message
 
 	def onError(self, err):
 		if type(err) is websocket._exceptions.WebSocketConnectionClosedException:
@@ -64,6 +148,86 @@ class WebSocketTransport(Transport):
 		else:
 			raise WebSocketError("Unknown error") from err
 
+class NativeWebSocketTransport(Transport):
+	def __init__(self, compression=None, bufferSize=65536):
+		super().__init__(__name__)
+		self.engine = None
+		self.opcode = Opcode.text
+		self.compression = compression
+		self.bufferSize = bufferSize
+		self.sendLock = None
+
+	def initialize(self, url, header, onOpen, onMessage, onError, onClose):
+		self.url = url
+		self.header = dict(header)
+		if self.compression is not None:
+			self.header["Sec-WebSocket-Extensions"] = self.compression.offer()
+
+		self._onOpen = onOpen
+		self._onMessage = onMessage
+		self._onError = onError
+		self._onClose = onClose
+		self.engine = WebSocketEngine(self.bufferSize)
+		self.sendLock = threading.Lock()
+		self.stopping = False
+
+	# same callback order as websocket-client, onClose is always called at last
+	def run(self, verifySsl):
+		try:
+			self.engine.connect(self.url, self.header, verifySsl)
+			if self.compression is not None:
+				self.engine.compressionEnabled = self.compression.negotiate(self.engine.headers.get("sec-websocket-extensions"))
+			self._onOpen(self)
+
+			while True:
+				message = self.engine.recv()
+				if message is None: break
+
+				opcode, compressed, payload = message
+				if compressed: payload = self.compression.decompress(payload)
+				self._onMessage(self, payload)
+
+		except Exception as e:
+			# errors after stop are caused by closing the socket
+			if not self.stopping: self._onError(self, e)
+
+		finally:
+			self.engine.release()
+			self._onClose(self, self.engine.closeCode, self.engine.closeReason)
+
+	def stop(self):
+		if self.engine is None: return
+		self.stopping = True
+		self.engine.close()
+
+	def send(self, encoded):
+		if self.compression is None or not self.compression.enabled:
+			self.engine.send(encoded, self.opcode)
+			return
+
+		payload = encoded.encode("utf-8") if type(encoded) is str else encoded
+		if not self.compression.shouldCompress(payload):
+			self.engine.send(payload, self.opcode)
+			return
+
+		# compressor context must follow the order of frames on the wire
+		with self.sendLock:
+			self.engine.send(self.compression.compress(payload), self.opcode, rsv1=True)
+
+	def compressionRatio(self):
+		if self.compression is None: return None
+		return self.compression.ratio()
+
+	def onError(self, err):
+		if type(err) is WebSocketHandshakeError and err.statusCode == 401:
+			raise UnauthorizedError("websocket unauthorized error") from err
+
+		elif isinstance(err, (ConnectionError, socket.timeout)):
+			self.logger.info("websocket connection error : {0}".format(err))
+
+		else:
+			raise WebSocketError("Unknown error") from err
+
 class ServerSentEventsTransport(Transport):
 	def __init__(self):
 		super().__init__(__name__)
@@ -32,6 +32,11 @@ class Util(object):
 		if type(subject) is dict: message = json.dumps(subject)
 		if type(subject) is list: message = json.dumps(subject)
 		if type(subject) is str: message = subject
+		# decode only the logged part of raw payloads
+		if type(subject) in (bytes, bytearray, memoryview):
+			if len(subject) < 300: message = str(subject, "utf-8", "replace")
+			else: message = str(subject[0:99], "utf-8", "replace") + " ... " + str(subject[-100:-1], "utf-8", "replace")
+			return message
 		
 		if len(message) < 300: return message
 		return message[0:99] + " ... " + message[-100:-1]
@@ -0,0 +1,258 @@
+import base64
+import hashlib
+import os
+import socket
+import ssl
+import struct
+import threading
+from enum import IntEnum
+from urllib import parse
+
+from .Util import Util
+from .Error import *
+
+
+class Opcode(IntEnum):
+	continuation = 0x0
+	text = 0x1
+	binary = 0x2
+	close = 0x8
+	ping = 0x9
+	pong = 0xA
+
+
+# RFC 6455 client on a plain socket, receiving into one preallocated buffer
+class WebSocketEngine(object):
+	guid = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+	maxHandshakeSize = 65536
+	opcodes = frozenset(Opcode)
+
+	def __init__(self, bufferSize=65536):
+		self.logger = Util.configLogger(__name__)
+		self.sock = None
+		self.buffer = bytearray(bufferSize)
+		self.view = memoryview(self.buffer)
+		self.start = 0
+		self.end = 0
+		self.sendLock = threading.Lock()
+		self.closed = True
+		self.headers = {}
+		self.closeCode = None
+		self.closeReason = None
+		# set after permessage-deflate is negotiated, allows rsv1 on data messages
+		self.compressionEnabled = False
+
+	def connect(self, url, header, verifySsl=True, timeout=10):
+		parsedUrl = parse.urlparse(url)
+		secure = parsedUrl.scheme in ("wss", "https")
+		host = parsedUrl.hostname
+		port = parsedUrl.port or (443 if secure else 80)
+		path = parsedUrl.path or "/"
+		if parsedUrl.query != "": path += "?" + parsedUrl.query
+
+		self.sock = socket.create_connection((host, port), timeout)
+		self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+		if secure:
+			context = ssl.create_default_context()
+			if not verifySsl:
+				context.check_hostname = False
+				context.verify_mode = ssl.CERT_NONE
+			self.sock = context.wrap_socket(self.sock, server_hostname=host)
+
+		self._handshake(parsedUrl.netloc.rpartition("@")[2], path, header)
+		self.sock.settimeout(None)
+		self.closed = False
+
+	def _handshake(self, host, path, header):
+		key = base64.b64encode(os.urandom(16))
+		lines = [
+			"GET {0} HTTP/1.1".format(path),
+			"Host: {0}".format(host),
+			"Upgrade: websocket",
+			"Connection: Upgrade",
+			"Sec-WebSocket-Key: {0}".format(key.decode()),
+			"Sec-WebSocket-Version: 13"
+		]
+		lines += ["{0}: {1}".format(k, v) for k, v in header.items()]
+		self.sock.sendall(("\r\n".join(lines) + "\r\n\r\n").encode())
+
+		index = self.buffer.find(b"\r\n\r\n", 0, self.end)
+		while index < 0:
+			if self.end == len(self.buffer): self._growBuffer()
+			self._recvInto()
+			index = self.buffer.find(b"\r\n\r\n", 0, self.end)
+
+		response = str(self.view[:index], "latin-1").split("\r\n")
+		self.start = index + 4
+
+		statusLine = response[0].split(" ", 2)
+		statusCode = int(statusLine[1]) if len(statusLine) > 1 and statusLine[1].isdigit() else None
+		self.headers = {}
+		for line in response[1:]:
+			name, _, value = line.partition(":")
+			self.headers[name.strip().lower()] = value.strip()
+		self.logger.debug("handshake response {0} {1}".format(statusCode, self.headers))
+
+		if statusCode != 101:
+			raise WebSocketHandshakeError("Handshake status {0}".format(response[0]), statusCode)
+
+		accept = base64.b64encode(hashlib.sha1(key + self.guid).digest()).decode()
+		if self.headers.get("sec-websocket-accept") != accept:
+			raise WebSocketHandshakeError("invalid Sec-WebSocket-Accept header", statusCode)
+
+	# only while handshaking, no memoryview of the buffer has been handed out yet
+	def _growBuffer(self):
+		if len(self.buffer) >= self.maxHandshakeSize: raise WebSocketHandshakeError("handshake response is too large")
+		buffer = bytearray(min(len(self.buffer) * 2, self.maxHandshakeSize))
+		buffer[:self.end] = self.view[:self.end]
+		self.view.release()
+		self.buffer = buffer
+		self.view = memoryview(buffer)
+
+	def _recvInto(self):
+		received = self.sock.recv_into(self.view[self.end:])
+		if received == 0: raise ConnectionResetError("websocket connection closed by server")
+		self.end += received
+
+	# make n bytes readable from self.start, n must fit in the buffer
+	def _ensure(self, n):
+		if self.start == self.end: self.start = self.end = 0
+
+		while self.end - self.start < n:
+			if self.start + n > len(self.buffer):
+				size = self.end - self.start
+				self.view[:size] = self.view[self.start:self.end]
+				self.start, self.end = 0, size
+			self._recvInto()
+
+	def _recvHeader(self):
+		self._ensure(2)
+		first, second = self.buffer[self.start], self.buffer[self.start + 1]
+		if second & 0x80: raise WebSocketError("server must not mask frames")
+
+		length = second & 0x7F
+		headerLength = 2
+		if length == 126:
+			self._ensure(4)
+			length = struct.unpack_from("!H", self.buffer, self.start + 2)[0]
+			headerLength = 4
+		elif length == 127:
+			self._ensure(10)
+			length = struct.unpack_from("!Q", self.buffer, self.start + 2)[0]
+			headerLength = 10
+
+		self.start += headerLength
+		return bool(first & 0x80), first & 0x70, first & 0x0F, length
+
+	# RFC 6455 section 5.2 and 5.5, RFC 7692 section 6
+	def _validateFrame(self, fin, rsv, opcode, length, fragmented):
+		if opcode not in self.opcodes:
+			raise WebSocketError("reserved opcode {0:#x}".format(opcode))
+
+		if rsv & 0x30:
+			raise WebSocketError("rsv2/rsv3 set without negotiated extension")
+
+		if opcode >= Opcode.close:
+			if rsv: raise WebSocketError("rsv1 set on control frame")
+			if not fin or length > 125: raise WebSocketError("control frame must not be fragmented or longer than 125 bytes")
+			return
+
+		if opcode == Opcode.continuation:
+			if rsv: raise WebSocketError("rsv1 set on continuation frame")
+			if not fragmented: raise WebSocketError("continuation frame without message")
+			return
+
+		if fragmented: raise WebSocketError("new message before previous message is finished")
+		if rsv and not self.compressionEnabled: raise WebSocketError("rsv1 set without negotiated compression")
+
+	# payload stays in the receive buffer unless it is larger than the buffer
+	def _recvPayload(self, length):
+		if length <= len(self.buffer):
+			self._ensure(length)
+			payload = self.view[self.start:self.start + length]
+			self.start += length
+			return payload
+
+		payload = memoryview(bytearray(length))
+		received = self.end - self.start
+		payload[:received] = self.view[self.start:self.end]
+		self.start = self.end = 0
+
+		while received < length:
+			n = self.sock.recv_into(payload[received:])
+			if n == 0: raise ConnectionResetError("websocket connection closed by server")
+			received += n
+		return payload
+
+	# returns (opcode, compressed, payload) of next data message or None when closed
+	# payload is a memoryview which is valid until the next recv
+	def recv(self):
+		messageOpcode = None
+		compressed = False
+		fragments = None
+
+		while True:
+			fin, rsv, opcode, length = self._recvHeader()
+			self._validateFrame(fin, rsv, opcode, length, messageOpcode is not None)
+			payload = self._recvPayload(length)
+
+			if opcode >= Opcode.close:
+				if not self._handleControl(opcode, payload): return None
+				continue
+
+			if opcode != Opcode.continuation:
+				messageOpcode = opcode
+				compressed = rsv != 0
+
+			if fin and fragments is None: return messageOpcode, compressed, payload
+
+			if fragments is None: fragments = bytearray()
+			fragments += payload
+			if fin: return messageOpcode, compressed, memoryview(fragments)
+
+	def _handleControl(self, opcode, payload):
+		if opcode == Opcode.ping:
+			self.send(bytes(payload), Opcode.pong)
+
+		elif opcode == Opcode.close:
+			self.closeCode = struct.unpack_from("!H", payload)[0] if len(payload) >= 2 else None
+			self.closeReason = str(payload[2:], "utf-8", "replace")
+			self.logger.debug("close frame received {0} {1}".format(self.closeCode, self.closeReason))
+			self.close(self.closeCode or 1000)
+			return False
+
+		return True
+
+	@staticmethod
+	def mask(key, payload):
+		length = len(payload)
+		if length == 0: return b""
+		repeated = (key * (length // 4 + 1))[:length]
+		return (int.from_bytes(payload, "big") ^ int.from_bytes(repeated, "big")).to_bytes(length, "big")
+
+	def send(self, payload, opcode=Opcode.text, rsv1=False):
+		if type(payload) is str: payload = payload.encode("utf-8")
+
+		length = len(payload)
+		first = 0x80 | (0x40 if rsv1 else 0) | opcode
+		if length < 126: header = struct.pack("!BB", first, 0x80 | length)
+		elif length < 65536: header = struct.pack("!BBH", first, 0x80 | 126, length)
+		else: header = struct.pack("!BBQ", first, 0x80 | 127, length)
+
+		key = os.urandom(4)
+		with self.sendLock:
+			self.sock.sendall(header + key + self.mask(key, payload))
+
+	def close(self, code=1000):
+		if self.closed: return
+		self.closed = True
+
+		try:
+			self.send(struct.pack("!H", code), Opcode.close)
+			self.sock.shutdown(socket.SHUT_RDWR)
+		except OSError as e:
+			self.logger.debug("error while closing socket {0}".format(e))
+
+	def release(self):
+		self.closed = True
+		if self.sock is not None: self.sock.close()
@@ -0,0 +1,110 @@
+import base64
+import hashlib
+import socket
+import struct
+import threading
+import time
+import zlib
+
+
+class LocalServer(object):
+	guid = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+	# script is called with this server on its own thread after accepting one client
+	def __init__(self, script):
+		self.listener = socket.socket()
+		self.listener.bind(("127.0.0.1", 0))
+		self.listener.listen(1)
+		self.url = "ws://127.0.0.1:{0}/hub".format(self.listener.getsockname()[1])
+		self.script = script
+		self.sock = None
+		self.request = None
+		self.error = None
+		self.compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+		self.decompressor = zlib.decompressobj(-15)
+		self.thread = threading.Thread(target=self._run)
+		self.thread.daemon = True
+		self.thread.start()
+
+	def _run(self):
+		try:
+			self.sock, _ = self.listener.accept()
+			self.script(self)
+		except Exception as e:
+			self.error = e
+		finally:
+			if self.sock is not None: self.sock.close()
+			self.listener.close()
+
+	def join(self, timeout=5):
+		self.thread.join(timeout)
+		if self.thread.is_alive(): raise TimeoutError("server script did not finish")
+		if self.error is not None: raise self.error
+
+	def recvExact(self, n):
+		data = b""
+		while len(data) < n:
+			received = self.sock.recv(n - len(data))
+			if received == b"": raise EOFError("client closed connection")
+			data += received
+		return data
+
+	def handshake(self, status="101 Switching Protocols", extensions=None, accept=None):
+		request = b""
+		while b"\r\n\r\n" not in request: request += self.sock.recv(4096)
+		self.request = request.decode("latin-1")
+
+		key = [x.split(":", 1)[1].strip() for x in self.request.split("\r\n") if x.lower().startswith("sec-websocket-key:")][0]
+		if accept is None: accept = base64.b64encode(hashlib.sha1(key.encode() + self.guid).digest()).decode()
+
+		lines = ["HTTP/1.1 " + status, "Upgrade: websocket", "Connection: Upgrade", "Sec-WebSocket-Accept: " + accept]
+		if extensions is not None: lines.append("Sec-WebSocket-Extensions: " + extensions)
+		self.sock.sendall(("\r\n".join(lines) + "\r\n\r\n").encode())
+
+	def requestHeader(self, name):
+		for line in self.request.split("\r\n")[1:]:
+			key, _, value = line.partition(":")
+			if key.strip().lower() == name.lower(): return value.strip()
+		return None
+
+	@staticmethod
+	def frame(opcode, payload, fin=True, rsv1=False):
+		first = (0x80 if fin else 0) | (0x40 if rsv1 else 0) | opcode
+		length = len(payload)
+		if length < 126: header = struct.pack("!BB", first, length)
+		elif length < 65536: header = struct.pack("!BBH", first, 126, length)
+		else: header = struct.pack("!BBQ", first, 127, length)
+		return header + payload
+
+	def sendFrame(self, opcode, payload, fin=True, rsv1=False):
+		self.sock.sendall(self.frame(opcode, payload, fin, rsv1))
+
+	# sends data in pieces so the client has to join them across recv calls
+	def sendSplit(self, data, size=1, delay=0.001):
+		self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+		for i in range(0, len(data), size):
+			self.sock.sendall(data[i:i + size])
+			time.sleep(delay)
+
+	def compress(self, payload):
+		compressed = self.compressor.compress(payload) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+		return compressed[:-4]
+
+	# returns (fin, rsv1, opcode, payload) with payload unmasked
+	def recvFrame(self):
+		first, second = self.recvExact(2)
+		length = second & 0x7F
+		if length == 126: length = struct.unpack("!H", self.recvExact(2))[0]
+		elif length == 127: length = struct.unpack("!Q", self.recvExact(8))[0]
+
+		key = self.recvExact(4) if second & 0x80 else b"\x00" * 4
+		payload = bytes(x ^ key[i % 4] for i, x in enumerate(self.recvExact(length)))
+		return bool(first & 0x80), bool(first & 0x40), first & 0x0F, payload
+
+	# skips control frames, decompresses rsv1 messages
+	def recvMessage(self):
+		while True:
+			fin, rsv1, opcode, payload = self.recvFrame()
+			if opcode >= 0x8: continue
+			if rsv1: payload = self.decompressor.decompress(payload + b"\x00\x00\xff\xff")
+			return rsv1, payload
@@ -0,0 +1,123 @@
+import threading
+
+import pytest
+
+from signalrclient.Compression import PerMessageDeflate
+from LocalServer import LocalServer
+
+
+def test_offer():
+	assert PerMessageDeflate().offer() == "permessage-deflate; client_max_window_bits"
+	assert PerMessageDeflate(clientMaxWindowBits=10, serverMaxWindowBits=12,
+		clientNoContextTakeover=True, serverNoContextTakeover=True).offer() == \
+		"permessage-deflate; client_max_window_bits=10; server_max_window_bits=12; client_no_context_takeover; server_no_context_takeover"
+
+def test_negotiate():
+	compression = PerMessageDeflate()
+	assert compression.negotiate("permessage-deflate; client_max_window_bits=9; server_no_context_takeover")
+	assert compression.enabled
+	assert compression.windowBits == 9
+	assert compression.resetDecompressor
+	assert not compression.resetCompressor
+
+	assert compression.negotiate('x-webkit-deflate-frame, permessage-deflate; client_no_context_takeover')
+	assert compression.windowBits == 15
+	assert compression.resetCompressor
+
+def test_negotiate_rejected():
+	compression = PerMessageDeflate()
+	assert not compression.negotiate(None)
+	assert not compression.negotiate("x-webkit-deflate-frame")
+	assert not compression.enabled
+	assert not compression.shouldCompress(b"x" * 1000)
+
+def test_window_bits_range():
+	with pytest.raises(ValueError): PerMessageDeflate(clientMaxWindowBits=7)
+	with pytest.raises(ValueError): PerMessageDeflate(serverMaxWindowBits=16)
+
+@pytest.mark.parametrize("noContextTakeover", [False, True])
+def test_round_trip(noContextTakeover):
+	extension = "permessage-deflate" + ("; client_no_context_takeover; server_no_context_takeover" if noContextTakeover else "")
+	sender = PerMessageDeflate(clientMaxWindowBits=10)
+	receiver = PerMessageDeflate()
+	sender.negotiate(extension)
+	receiver.negotiate(extension)
+
+	message = b'{"type":1,"target":"sendMessage","arguments":["' + b"a" * 500 + b'"]}\x1e'
+	sizes = []
+	for _ in range(3):
+		compressed = sender.compress(message)
+		assert not compressed.endswith(PerMessageDeflate.tail)
+		assert receiver.decompress(memoryview(compressed)) == message
+		sizes.append(len(compressed))
+
+	# with context takeover repeated messages refer back to earlier ones
+	if noContextTakeover: assert sizes[0] == sizes[1] == sizes[2]
+	else: assert sizes[1] < sizes[0]
+	assert 0 < sender.ratio() < 1
+
+def test_threshold():
+	compression = PerMessageDeflate(threshold=100)
+	compression.negotiate("permessage-deflate")
+	assert not compression.shouldCompress(b"x" * 99)
+	assert compression.shouldCompress(b"x" * 100)
+
+def test_websocket_transport():
+	websocket = pytest.importorskip("websocket")
+	from signalrclient.Transport import WebSocketTransport
+
+	big = ('{"type":1,"target":"receive","arguments":["' + "b" * 1000 + '"]}\x1e').encode()
+	received = []
+
+	def script(server):
+		server.handshake(extensions="permessage-deflate; client_max_window_bits=12")
+		server.sendFrame(0x1, server.compress(big), rsv1=True)
+		server.sendFrame(0x1, b'{"type":6}\x1e')
+		received.append(server.recvMessage())
+		received.append(server.recvMessage())
+		server.sendFrame(0x8, b"\x03\xe8")
+		server.recvFrame()
+
+	server = LocalServer(script)
+	transport = WebSocketTransport(compression=PerMessageDeflate(threshold=100))
+	messages = []
+	errors = []
+
+	def onMessage(ws, message):
+		messages.append(message)
+		if len(messages) == 2:
+			transport.send("x" * 20)
+			transport.send("y" * 2000)
+
+	transport.initialize(server.url, {}, lambda ws: None, onMessage, lambda ws, e: errors.append(e), lambda ws, code, reason: None)
+	thread = threading.Thread(target=transport.run, args=(True,))
+	thread.daemon = True
+	thread.start()
+	server.join()
+	thread.join(5)
+
+	assert server.requestHeader("Sec-WebSocket-Extensions") == "permessage-deflate; client_max_window_bits"
+	assert transport.compression.windowBits == 12
+	assert messages == [big.decode(), '{"type":6}\x1e']
+	assert received == [(False, b"x" * 20), (True, b"y" * 2000)]
+	assert transport.compressionRatio() < 1
+	# newer websocket-client reports a normal close through on_error too
+	assert all(type(e) is websocket.WebSocketConnectionClosedException for e in errors)
+
+@pytest.mark.parametrize("version, supported", [("1.4.2", False), ("1.5.0", True), ("1.9.2", True), ("1.10.0", False), ("2.0.0", False)])
+def test_supported_websocket_client(monkeypatch, version, supported):
+	websocket = pytest.importorskip("websocket")
+	from signalrclient import Transport
+
+	monkeypatch.setattr(websocket, "__version__", version)
+	assert Transport.WebSocketTransport._supportsCompression() == supported
+
+def test_unsupported_websocket_client_disables_compression(monkeypatch):
+	websocket = pytest.importorskip("websocket")
+	from signalrclient.Transport import WebSocketTransport
+
+	monkeypatch.setattr(websocket, "__version__", "1.10.0")
+	transport = WebSocketTransport(compression=PerMessageDeflate())
+	transport.initialize("ws://localhost/hub", {}, None, None, None, None)
+	assert transport.compression is None
+	assert "Sec-WebSocket-Extensions" not in transport.webSocket.header
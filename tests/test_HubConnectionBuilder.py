@@ -0,0 +1,35 @@
+import pytest
+
+from signalrclient.HubConnectionBuilder import HubConnectionBuilder
+
+
+@pytest.mark.parametrize("kwargs, error", [
+	({"rate": "10"}, TypeError),
+	({"rate": 0}, ValueError),
+	({"rate": -1}, ValueError),
+	({"rate": 10, "burst": 1.5}, TypeError),
+	({"rate": 10, "burst": 0}, ValueError),
+	({"burst": 5}, ValueError),
+	({"targets": []}, TypeError),
+	({"targets": {"x": "1"}}, TypeError),
+	({"targets": {"x": -1}}, ValueError),
+	({"targets": {"x": (1, 2, 3)}}, ValueError),
+	({"targets": {"x": (1, 0)}}, ValueError),
+	({"targets": {"x": (0, 1)}}, ValueError),
+	({"targets": {"x": (1, "2")}}, TypeError),
+	({"adaptive": 1}, TypeError)
+])
+def test_with_rate_limit_invalid(kwargs, error):
+	with pytest.raises(error): HubConnectionBuilder().withRateLimit(**kwargs)
+
+def test_with_rate_limit():
+	connection = HubConnectionBuilder() \
+		.withUrl("ws://localhost/hub") \
+		.withRateLimit(rate=10, burst=2, targets={"x": 1, "y": (0.5, 3)}, adaptive=True) \
+		.build()
+
+	limiter = connection.rateLimiter
+	assert limiter.connectionBucket.burst == 2
+	assert limiter.targetBuckets["y"].rate == 0.5
+	assert limiter.targetBuckets["y"].burst == 3
+	assert limiter.adaptive
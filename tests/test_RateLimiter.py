@@ -0,0 +1,141 @@
+import time
+
+import pytest
+
+from signalrclient.ConnectionChecker import ConnectionChecker, ConnectionState
+from signalrclient.Error import RateLimitError
+from signalrclient.HubConnection import HubConnection
+from signalrclient.Protocol import JsonProtocol
+from signalrclient.RateLimiter import RateLimiter
+
+
+class FakeTransport(object):
+	def __init__(self):
+		self.sent = []
+
+	def send(self, encoded):
+		self.sent.append(encoded)
+
+
+def createConnection(rateLimiter):
+	connection = HubConnection(
+		url="ws://localhost/hub",
+		protocol=JsonProtocol(version=1),
+		transport=FakeTransport(),
+		connectionChecker=ConnectionChecker(15, None),
+		reconnection=None,
+		surrender=True,
+		authFunction=None,
+		verifySsl=True,
+		skipNegotiation=True,
+		headers={},
+		rateLimiter=rateLimiter
+	)
+	connection.state = ConnectionState.connected
+	return connection
+
+
+def test_burst_exhaustion():
+	limiter = RateLimiter(rate=10, burst=3)
+	assert [limiter.tryAcquire() for _ in range(4)] == [True, True, True, False]
+
+	time.sleep(0.12)
+	assert limiter.tryAcquire()
+	assert not limiter.tryAcquire()
+
+def test_acquire_waits_for_token():
+	limiter = RateLimiter(rate=10, burst=1)
+	assert limiter.tryAcquire()
+
+	start = time.monotonic()
+	assert limiter.acquire(timeout=1)
+	assert 0.07 < time.monotonic() - start < 0.3
+
+def test_acquire_timeout():
+	limiter = RateLimiter(rate=1, burst=1)
+	assert limiter.tryAcquire()
+
+	start = time.monotonic()
+	assert not limiter.acquire(timeout=0.2)
+	assert 0.18 < time.monotonic() - start < 0.5
+
+def test_target_bucket():
+	limiter = RateLimiter(rate=100, burst=3, targets={"slow": (1, 1)})
+	assert limiter.tryAcquire("slow")
+	assert not limiter.tryAcquire("slow")
+
+	# other targets use only the connection bucket, which "slow" also consumed
+	assert limiter.tryAcquire("fast")
+	assert limiter.tryAcquire("fast")
+	assert not limiter.tryAcquire("fast")
+
+def test_no_limit():
+	limiter = RateLimiter()
+	assert all(limiter.tryAcquire("x") for _ in range(1000))
+
+def test_adaptive_latency():
+	limiter = RateLimiter(rate=10, adaptive=True, adjustInterval=0)
+	limiter.reportLatency(0.01)
+	assert limiter.scale == 1.0
+
+	for _ in range(5): limiter.reportLatency(0.1)
+	assert limiter.scale < 0.5
+
+	for _ in range(50): limiter.reportLatency(0.01)
+	assert limiter.scale == 1.0
+
+def test_adaptive_halves_scale():
+	limiter = RateLimiter(rate=10, adaptive=True, adjustInterval=0)
+	limiter.reportLatency(0.01)
+	limiter.reportLatency(1.0)
+	assert limiter.scale == 0.5
+
+def test_adaptive_timeout():
+	limiter = RateLimiter(rate=10, adaptive=True)
+	limiter.reportTimeout()
+	assert limiter.scale == 0.5
+	limiter.reportTimeout()
+	assert limiter.scale == 0.25
+
+def test_adaptive_min_scale():
+	limiter = RateLimiter(rate=10, adaptive=True, minScale=0.2)
+	for _ in range(10): limiter.reportTimeout()
+	assert limiter.scale == 0.2
+
+def test_not_adaptive():
+	limiter = RateLimiter(rate=10, adjustInterval=0)
+	limiter.reportLatency(0.01)
+	limiter.reportLatency(1.0)
+	limiter.reportTimeout()
+	assert limiter.scale == 1.0
+
+def test_scale_slows_refill():
+	limiter = RateLimiter(rate=20, burst=1, adaptive=True)
+	limiter.reportTimeout()
+	limiter.reportTimeout()
+	assert limiter.tryAcquire()
+
+	# 5 tokens/sec after scaling, 20 tokens/sec would refill within 0.1 sec
+	time.sleep(0.1)
+	assert not limiter.tryAcquire()
+
+def test_send_rate_limit_error():
+	connection = createConnection(RateLimiter(rate=1, burst=1))
+	connection.send("x", [1])
+
+	start = time.monotonic()
+	with pytest.raises(RateLimitError): connection.send("x", [2], timeout=0.1)
+	assert time.monotonic() - start >= 0.09
+	assert len(connection.transport.sent) == 1
+
+def test_try_send():
+	connection = createConnection(RateLimiter(rate=1, burst=2))
+	assert connection.trySend("x", [1])
+	assert connection.trySend("x", [2])
+	assert not connection.trySend("x", [3])
+	assert len(connection.transport.sent) == 2
+
+def test_send_without_limit():
+	connection = createConnection(None)
+	for i in range(100): assert connection.trySend("x", [i])
+	assert len(connection.transport.sent) == 100
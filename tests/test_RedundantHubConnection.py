@@ -0,0 +1,150 @@
+import time
+import types
+
+import pytest
+
+from signalrclient.ConnectionChecker import ConnectionState
+from signalrclient.Error import InvokeTimeoutError, NotConnectedError, RateLimitError
+from signalrclient.HubConnectionBuilder import HubConnectionBuilder
+from signalrclient.RedundantHubConnection import RedundantHubConnection
+
+
+class FakeConnection(object):
+	def __init__(self, delay=0.0, fail=False, ratio=None, error=RuntimeError):
+		self.delay = delay
+		self.fail = fail
+		self.error = error
+		self.ratio = ratio
+		self.calls = 0
+		self.invokeTimeout = 5
+		self.state = ConnectionState.connected
+		self.connectionChecker = types.SimpleNamespace(lastReceived=None)
+
+	def onOpen(self, handler): pass
+	def onClose(self, handler): pass
+
+	def invoke(self, target, arguments):
+		self.calls += 1
+		time.sleep(min(self.delay, self.invokeTimeout))
+		if self.delay > self.invokeTimeout: raise InvokeTimeoutError()
+		if self.fail: raise self.error("invoke failed")
+		return target
+
+	def compressionRatio(self):
+		return self.ratio
+
+
+def test_hedge_after_delay():
+	slow, fast = FakeConnection(delay=2), FakeConnection(delay=0.05)
+	conn = RedundantHubConnection([slow, fast], hedgeDelay=0.1)
+
+	start = time.monotonic()
+	assert conn.invoke("x", []) == "x"
+	assert time.monotonic() - start < 0.5
+	assert slow.calls == 1 and fast.calls == 1
+
+def test_failure_falls_back_immediately():
+	conn = RedundantHubConnection([FakeConnection(fail=True), FakeConnection(delay=0.05)], hedgeDelay=1)
+
+	start = time.monotonic()
+	assert conn.invoke("x", []) == "x"
+	assert time.monotonic() - start < 0.5
+
+def test_failing_endpoint_is_ranked_down():
+	failing, healthy = FakeConnection(fail=True), FakeConnection()
+	conn = RedundantHubConnection([failing, healthy], hedgeDelay=0.3)
+
+	for _ in range(5): assert conn.invoke("x", []) == "x"
+	assert failing.calls == 1
+	assert healthy.calls == 5
+
+def test_hanging_endpoint_is_ranked_down():
+	hanging, healthy = FakeConnection(delay=10), FakeConnection()
+	conn = RedundantHubConnection([hanging, healthy], hedgeDelay=0.1)
+	conn.invokeTimeout = 1
+
+	start = time.monotonic()
+	for _ in range(5): assert conn.invoke("x", []) == "x"
+	assert hanging.calls == 1
+	assert time.monotonic() - start < 0.5
+
+def test_no_hedge():
+	slow, fast = FakeConnection(delay=0.3), FakeConnection()
+	conn = RedundantHubConnection([slow, fast], hedge=False, hedgeDelay=0.01)
+	assert conn.invoke("x", []) == "x"
+	assert fast.calls == 0
+
+def test_timeout():
+	conn = RedundantHubConnection([FakeConnection(delay=10)], hedgeDelay=0.1)
+	conn.invokeTimeout = 0.2
+	with pytest.raises(InvokeTimeoutError): conn.invoke("x", [])
+
+def test_not_connected():
+	connection = FakeConnection()
+	connection.state = ConnectionState.disconnected
+	with pytest.raises(NotConnectedError): RedundantHubConnection([connection]).invoke("x", [])
+
+def test_invoke_timeout_propagates():
+	connections = [FakeConnection(), FakeConnection()]
+	conn = RedundantHubConnection(connections)
+	conn.invokeTimeout = 30
+	assert [x.invokeTimeout for x in connections] == [30, 30]
+
+def test_compression_ratio():
+	assert RedundantHubConnection([FakeConnection(), FakeConnection()]).compressionRatio() is None
+	assert RedundantHubConnection([FakeConnection(ratio=0.2), FakeConnection(ratio=0.4), FakeConnection()]).compressionRatio() == pytest.approx(0.3)
+
+def test_hedge_delay_percentile():
+	conn = RedundantHubConnection([FakeConnection()], hedgeDelay=1, minSamples=20)
+	assert conn.hedgeDelay() == 1
+	for i in range(100): conn.endpoints[0].recordSuccess(i / 100)
+	assert conn.hedgeDelay() == pytest.approx(0.94)
+
+def test_failed_endpoint_recovers():
+	a, b, c = FakeConnection(fail=True), FakeConnection(delay=0.02), FakeConnection(delay=0.04)
+	conn = RedundantHubConnection([a, b, c], hedgeDelay=1, failureHalfLife=0.05)
+
+	assert conn.invoke("x", []) == "x"
+	a.fail = False
+	for _ in range(3): conn.invoke("x", [])
+	assert a.calls == 1
+
+	time.sleep(0.5)
+	for _ in range(20): conn.invoke("x", [])
+	assert a.calls > 15
+
+def test_failures_fade_out():
+	endpoint = RedundantHubConnection([FakeConnection()], failureHalfLife=0.1).endpoints[0]
+	endpoint.recordFailure()
+	endpoint.recordFailure()
+	assert endpoint.recentFailures(time.monotonic()) == pytest.approx(2, abs=0.1)
+	assert endpoint.recentFailures(time.monotonic() + 0.1) == pytest.approx(1, abs=0.1)
+	assert endpoint.recentFailures(time.monotonic() + 1) < 0.01
+
+def test_stale_endpoint_is_ranked_down():
+	stale, fresh = FakeConnection(), FakeConnection(delay=0.01)
+	stale.connectionChecker.lastReceived = time.time() - 60
+	fresh.connectionChecker.lastReceived = time.time()
+	conn = RedundantHubConnection([stale, fresh], hedgeDelay=1, staleAfter=30)
+
+	conn.invoke("x", [])
+	assert stale.calls == 0 and fresh.calls == 1
+
+def test_rate_limit_is_not_endpoint_failure():
+	throttled, healthy = FakeConnection(fail=True, error=RateLimitError), FakeConnection(delay=0.01)
+	conn = RedundantHubConnection([throttled, healthy], hedgeDelay=1)
+
+	assert conn.invoke("x", []) == "x"
+	assert conn.endpoints[0].failures == 0
+	assert conn._healthyEndpoints()[0].connection is throttled
+
+def test_builder_shares_rate_limiter():
+	conn = HubConnectionBuilder() \
+		.withUrl("ws://localhost/hub") \
+		.withRateLimit(rate=10) \
+		.withRedundantUrls(["ws://localhost:8080/hub", "ws://localhost:8081/hub"]) \
+		.build()
+
+	limiters = [x.connection.rateLimiter for x in conn.endpoints]
+	assert limiters[0] is not None
+	assert all(x is limiters[0] for x in limiters)
@@ -0,0 +1,299 @@
+import socket
+import ssl
+import struct
+import threading
+
+import pytest
+
+from signalrclient.Compression import PerMessageDeflate
+from signalrclient.Error import UnauthorizedError, WebSocketError, WebSocketHandshakeError
+from signalrclient.Transport import NativeWebSocketTransport
+from signalrclient.WebSocketEngine import WebSocketEngine, Opcode
+from LocalServer import LocalServer
+
+
+def connect(script, bufferSize=65536, header={}):
+	server = LocalServer(script)
+	engine = WebSocketEngine(bufferSize)
+	engine.connect(server.url, header)
+	return server, engine
+
+def closeScript(server):
+	server.sendFrame(Opcode.close, struct.pack("!H", 1000))
+	server.recvFrame()
+
+
+def test_mask():
+	key = b"\x01\x02\x03\x04"
+	payload = bytes(range(256)) * 3 + b"xyz"
+	masked = WebSocketEngine.mask(key, payload)
+	assert masked == bytes(x ^ key[i % 4] for i, x in enumerate(payload))
+	assert WebSocketEngine.mask(key, masked) == payload
+	assert WebSocketEngine.mask(key, b"") == b""
+
+def test_handshake_request():
+	def script(server):
+		server.handshake()
+		closeScript(server)
+
+	server, engine = connect(script, header={"Authorization": "Bearer x"})
+	assert engine.recv() is None
+	server.join()
+	assert server.request.startswith("GET /hub HTTP/1.1\r\n")
+	assert server.requestHeader("Authorization") == "Bearer x"
+	assert server.requestHeader("Sec-WebSocket-Version") == "13"
+
+def test_frames_split_across_recv():
+	messages = [("message %d " % i).encode() * 5 for i in range(10)]
+
+	def script(server):
+		server.handshake()
+		server.sendSplit(b"".join(server.frame(Opcode.text, x) for x in messages), size=7)
+		closeScript(server)
+
+	# small buffer makes the engine compact partly received frames
+	server, engine = connect(script, bufferSize=64)
+	received = []
+	for _ in messages:
+		opcode, compressed, payload = engine.recv()
+		assert type(payload) is memoryview
+		received.append(bytes(payload))
+	assert received == messages
+	assert engine.recv() is None
+	server.join()
+
+def test_extended_lengths():
+	payloads = [b"a" * 125, b"b" * 126, b"c" * 65535, b"d" * 65536]
+
+	def script(server):
+		server.handshake()
+		for payload in payloads: server.sendFrame(Opcode.binary, payload)
+		closeScript(server)
+
+	server, engine = connect(script, bufferSize=1 << 17)
+	for payload in payloads:
+		opcode, compressed, received = engine.recv()
+		assert opcode == Opcode.binary
+		assert bytes(received) == payload
+	assert engine.recv() is None
+	server.join()
+
+def test_ping_between_fragments():
+	pongs = []
+
+	def script(server):
+		server.handshake()
+		server.sendFrame(Opcode.text, b"hello ", fin=False)
+		server.sendFrame(Opcode.ping, b"ping")
+		server.sendFrame(Opcode.continuation, b"world", fin=False)
+		server.sendFrame(Opcode.continuation, b"!")
+		pongs.append(server.recvFrame())
+		closeScript(server)
+
+	server, engine = connect(script)
+	opcode, compressed, payload = engine.recv()
+	assert (opcode, bytes(payload)) == (Opcode.text, b"hello world!")
+	assert engine.recv() is None
+	server.join()
+	assert pongs == [(True, False, Opcode.pong, b"ping")]
+
+def test_payload_larger_than_buffer():
+	payload = bytes(range(256)) * 100
+
+	def script(server):
+		server.handshake()
+		server.sendFrame(Opcode.binary, payload)
+		server.sendFrame(Opcode.text, b"after")
+		closeScript(server)
+
+	server, engine = connect(script, bufferSize=1024)
+	assert bytes(engine.recv()[2]) == payload
+	assert bytes(engine.recv()[2]) == b"after"
+	assert engine.recv() is None
+	server.join()
+
+def test_client_frames_are_masked():
+	frames = []
+
+	def script(server):
+		server.handshake()
+		first, second = server.recvExact(2)
+		frames.append((first, second & 0x80))
+		frames.append(server.recvExact(4 + 5))
+		frames.append(server.recvFrame())
+		closeScript(server)
+
+	server, engine = connect(script)
+	engine.send("hello")
+	engine.send(b"x" * 300, Opcode.binary)
+	assert engine.recv() is None
+	server.join()
+	assert frames[0] == (0x81, 0x80)
+	assert WebSocketEngine.mask(frames[1][:4], frames[1][4:]) == b"hello"
+	assert frames[2] == (True, False, Opcode.binary, b"x" * 300)
+
+def test_server_close():
+	replies = []
+
+	def script(server):
+		server.handshake()
+		server.sendFrame(Opcode.close, struct.pack("!H", 1001) + b"going away")
+		replies.append(server.recvFrame())
+
+	server, engine = connect(script)
+	assert engine.recv() is None
+	assert engine.closeCode == 1001
+	assert engine.closeReason == "going away"
+	assert engine.closed
+	server.join()
+	assert replies == [(True, False, Opcode.close, struct.pack("!H", 1001))]
+
+def test_masked_server_frame():
+	def script(server):
+		server.handshake()
+		server.sock.sendall(b"\x81\x81" + b"\x00" * 4 + b"x")
+
+	server, engine = connect(script)
+	with pytest.raises(WebSocketError): engine.recv()
+	engine.release()
+	server.join()
+
+@pytest.mark.parametrize("frames, message", [
+	([bytes([0x83, 1]) + b"x"], "reserved opcode 0x3"),
+	([bytes([0x87, 1]) + b"x"], "reserved opcode 0x7"),
+	([bytes([0x8B, 1]) + b"x"], "reserved opcode 0xb"),
+	([bytes([0x8F, 0])], "reserved opcode 0xf"),
+	([bytes([0xA1, 1]) + b"x"], "rsv2/rsv3"),
+	([bytes([0x91, 1]) + b"x"], "rsv2/rsv3"),
+	([bytes([0xC1, 1]) + b"x"], "rsv1 set without negotiated compression"),
+	([bytes([0x80, 1]) + b"x"], "continuation frame without message"),
+	([bytes([0x01, 1]) + b"x", bytes([0x81, 1]) + b"y"], "new message before previous message is finished"),
+	([bytes([0x09, 0])], "control frame must not be fragmented"),
+	([LocalServer.frame(Opcode.ping, b"x" * 126)], "longer than 125 bytes")
+])
+def test_invalid_frames(frames, message):
+	def script(server):
+		server.handshake()
+		server.sock.sendall(b"".join(frames))
+
+	server, engine = connect(script)
+	with pytest.raises(WebSocketError, match=message): engine.recv()
+	engine.release()
+	server.join()
+
+def test_rsv1_on_control_frame_with_compression():
+	def script(server):
+		server.handshake()
+		server.sock.sendall(bytes([0xC9, 0]))
+
+	server, engine = connect(script)
+	engine.compressionEnabled = True
+	with pytest.raises(WebSocketError, match="rsv1 set on control frame"): engine.recv()
+	engine.release()
+	server.join()
+
+def test_transport_rsv1_without_compression():
+	def script(server):
+		server.handshake()
+		server.sendFrame(Opcode.text, server.compress(b"x" * 100), rsv1=True)
+
+	# compression offered but not accepted by the server
+	server = LocalServer(script)
+	transport = NativeWebSocketTransport(compression=PerMessageDeflate())
+	thread, events = runTransport(transport, server.url, lambda ws, message: events.append(message))
+	server.join()
+	thread.join(5)
+
+	assert events[0] == "open"
+	assert type(events[1]) is WebSocketError
+	assert "rsv1" in str(events[1])
+	with pytest.raises(WebSocketError, match="Unknown error"): transport.onError(events[1])
+
+def test_handshake_unauthorized():
+	server = LocalServer(lambda server: server.handshake(status="401 Unauthorized"))
+	engine = WebSocketEngine()
+	with pytest.raises(WebSocketHandshakeError) as e: engine.connect(server.url, {})
+	assert e.value.statusCode == 401
+	engine.release()
+	server.join()
+
+	with pytest.raises(UnauthorizedError): NativeWebSocketTransport().onError(e.value)
+
+def test_handshake_bad_accept():
+	server = LocalServer(lambda server: server.handshake(accept="invalid"))
+	engine = WebSocketEngine()
+	with pytest.raises(WebSocketHandshakeError, match="Sec-WebSocket-Accept"): engine.connect(server.url, {})
+	engine.release()
+	server.join()
+
+def test_on_error():
+	transport = NativeWebSocketTransport()
+	transport.onError(ConnectionRefusedError())
+	transport.onError(socket.timeout())
+	with pytest.raises(WebSocketError): transport.onError(ssl.SSLCertVerificationError())
+	with pytest.raises(WebSocketError): transport.onError(ValueError())
+
+
+def runTransport(transport, url, onMessage):
+	events = []
+	transport.initialize(url, {},
+		lambda ws: events.append("open"),
+		onMessage,
+		lambda ws, e: events.append(e),
+		lambda ws, code, reason: events.append(("close", code)))
+	thread = threading.Thread(target=transport.run, args=(True,))
+	thread.daemon = True
+	thread.start()
+	return thread, events
+
+def test_transport_compression():
+	big = ('{"type":1,"target":"receive","arguments":["' + "b" * 1000 + '"]}\x1e').encode()
+	received = []
+
+	def script(server):
+		server.handshake(extensions="permessage-deflate")
+		server.sendFrame(Opcode.text, server.compress(big), rsv1=True)
+		server.sendFrame(Opcode.text, server.compress(big), rsv1=True)
+		server.sendFrame(Opcode.text, b'{"type":6}\x1e')
+		received.append(server.recvMessage())
+		received.append(server.recvMessage())
+		closeScript(server)
+
+	server = LocalServer(script)
+	transport = NativeWebSocketTransport(compression=PerMessageDeflate(threshold=100))
+	messages = []
+
+	def onMessage(ws, message):
+		messages.append(bytes(message))
+		if len(messages) == 3:
+			transport.send("x" * 20)
+			transport.send("y" * 2000)
+
+	thread, events = runTransport(transport, server.url, onMessage)
+	server.join()
+	thread.join(5)
+
+	assert server.requestHeader("Sec-WebSocket-Extensions") == "permessage-deflate; client_max_window_bits"
+	assert messages == [big, big, b'{"type":6}\x1e']
+	assert received == [(False, b"x" * 20), (True, b"y" * 2000)]
+	assert events == ["open", ("close", 1000)]
+
+def test_transport_stop():
+	stopped = threading.Event()
+
+	def script(server):
+		server.handshake()
+		server.recvFrame()
+		stopped.set()
+
+	server = LocalServer(script)
+	transport = NativeWebSocketTransport()
+	thread, events = runTransport(transport, server.url, None)
+	while "open" not in events: thread.join(0.01)
+	transport.stop()
+	thread.join(5)
+	server.join()
+
+	assert not thread.is_alive()
+	assert stopped.is_set()
+	assert events == ["open", ("close", None)]